@@ -1,11 +1,32 @@
 from __future__ import annotations
 
-from collections import Iterator
-from typing import Optional, Any
+import os
+from bisect import bisect_left
+
+# typing is only needed for the annotations, which aren't evaluated.
+# TYPE_CHECKING is spelled out on purpose: typing.TYPE_CHECKING would
+# import typing, which is most of this module's import time.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from array import array
+    from collections.abc import Iterator
+    from typing import Optional, Any, BinaryIO, TextIO
 
 from ordered_list import (
     OrderedList, insert, pop, size)
 
+# default limit, in bytes, on the memory used while encoding or decoding
+DEFAULT_MAX_MEMORY = 1 << 26
+# number of chunks huffman_decode_parallel gives each worker
+CHUNKS_PER_WORKER = 4
+# memory counted for each worker process of huffman_decode_parallel before
+# it decodes anything, about what a forked worker costs
+WORKER_MEMORY = 1 << 22
+# inputs smaller than this are encoded faster without NumPy
+NUMPY_MIN_INPUT = 1 << 20
+# about what importing NumPy adds to a process
+NUMPY_MEMORY = 1 << 24
+
 
 class HuffmanNode:
     """Represents a node in a Huffman tree.
@@ -49,19 +70,53 @@ class HuffmanNode:
         return self.frequency < other.frequency
 
 
-def count_frequencies(filename: str) -> list[int]:
+def _check_max_memory(max_memory: int) -> None:
+    if max_memory <= 0:
+        raise ValueError("max_memory must be positive")
+
+
+def count_frequencies(
+        filename: str,
+        max_memory: int = DEFAULT_MAX_MEMORY,
+        use_numpy: Optional[bool] = None) -> list[int]:
     """Reads the given file and counts the frequency of each character.
 
     The resulting Python list will be of length 256, where the indices
     are the ASCII values of the characters, and the value at a given
     index is the frequency with which that character occured.
+
+    The file is read as bytes, in chunks sized to keep memory use to about
+    max_memory bytes, so a file with no newlines is never read into memory
+    all at once.  With use_numpy each chunk is counted with NumPy, which
+    needs the same max_memory as in write_codes; by default that is
+    decided as for huffman_encode.
     """
+    _check_max_memory(max_memory)
     frequency = [0] * 256
-
-    with open(filename) as file:
-        for line_of_text in file:
-            for char in line_of_text:
-                frequency[ord(char)] += 1
+    # reading a chunk briefly holds both it and the previous one
+    read_size = max(1, max_memory // 4)
+    if use_numpy is None:
+        use_numpy = _use_numpy(os.path.getsize(filename), max_memory)
+
+    if use_numpy:
+        np = _import_numpy(max_memory)
+        read_size = (max_memory - NUMPY_MEMORY) // 4
+        with open(filename, 'rb') as file:
+            chunk = file.read(read_size)
+            while chunk:
+                counts = np.bincount(
+                    np.frombuffer(chunk, dtype=np.uint8), minlength=256)
+                for byte in range(256):
+                    frequency[byte] += int(counts[byte])
+                chunk = file.read(read_size)
+        return frequency
+
+    with open(filename, 'rb') as file:
+        chunk = file.read(read_size)
+        while chunk:
+            for byte in chunk:
+                frequency[byte] += 1
+            chunk = file.read(read_size)
     # for each char (the index) that appears, increment its count
     return frequency
 
@@ -158,40 +213,377 @@ def parse_header(header: str) -> list[int]:
     return frequency
 
 
-def huffman_decode(in_filename: str, out_filename: str) -> None:
-    # test for single char cases.
-    with open(out_filename, 'w') as file:
+def _read_segments(file: TextIO, read_size: int) -> Iterator[tuple[str, str]]:
+    """Reads an encoded file, yielding ("header", line) for each segment's
+    header and ("bits", text) for the bits that follow it, read_size
+    characters at most at a time.
+
+    An encoded file is one or more segments, each a header line followed
+    by its bits on a line of their own.  A segment whose tree has fewer
+    than two leaves has no bits, so the next line is the next header.
+    """
+    header = ""
+    in_header = True
+    pending = ""
+    while True:
+        if not pending:
+            pending = file.read(read_size)
+            if not pending:
+                break
+        end = pending.find("\n")
+        if in_header:
+            if end == -1:
+                header += pending
+                pending = ""
+                continue
+            header += pending[:end]
+            pending = pending[end + 1:]
+            yield "header", header
+            leaves = sum(1 for frequency in parse_header(header) if frequency)
+            in_header = leaves < 2
+            header = ""
+        elif end == -1:
+            yield "bits", pending
+            pending = ""
+        else:
+            if end > 0:
+                yield "bits", pending[:end]
+            pending = pending[end + 1:]
+            in_header = True
+    if header:
+        yield "header", header
+
+
+def _write_repeated(
+        file: BinaryIO, byte: int, count: int, buffer_size: int) -> None:
+    # writes byte count times, buffer_size bytes at most at a time
+    while count > 0:
+        length = min(count, buffer_size)
+        file.write(bytes((byte,)) * length)
+        count -= length
+
+
+def huffman_decode(
+        in_filename: str,
+        out_filename: str,
+        max_memory: int = DEFAULT_MAX_MEMORY) -> None:
+    """Decodes the data in the input file, writing the result to the
+    output file.
+
+    Each segment of the input (see huffman_append) is decoded with the
+    tree from its own header.  The decoded characters are written as
+    bytes.  The bits are read in chunks and the output is written whenever
+    its buffer fills, keeping memory use to about max_memory bytes.
+    """
+    _check_max_memory(max_memory)
+    # reading text briefly holds the raw bytes, the new chunk and the
+    # previous one, and the output buffer may be over-allocated; leave
+    # the rest for the file objects' own buffers and the tree
+    read_size = max(1, max_memory // 16)
+    buffer_size = max(1, max_memory // 8)
+    with open(out_filename, 'wb') as file:
         with open(in_filename, 'r') as file_two:
-            header = file_two.readline()
-            frequencies = parse_header(header)
-            tree = build_huffman_tree(frequencies)
-            root = tree
-            if tree is None:
-                return None
-            elif tree.left is None and tree.right is None:
-                for i in range(tree.frequency):
-                    file.write(chr(tree.char))
-                return None
-
-            for line_of_text in file_two:
-                for char in line_of_text:
+            decoded = bytearray()
+            tree = root = None
+            for kind, text in _read_segments(file_two, read_size):
+                if kind == "header":
+                    tree = root = build_huffman_tree(parse_header(text))
+                    # test for single char cases.
+                    if tree is not None and (
+                            tree.left is None and tree.right is None):
+                        file.write(decoded)
+                        decoded.clear()
+                        _write_repeated(
+                            file, tree.char, tree.frequency, buffer_size)
+                    continue
+
+                for char in text:
                     if char == '0':
                         tree = tree.left
-                        if tree.right is None and tree.left is None:
-                            file.write(chr(tree.char))
-                            tree = root
-
                     else:
                         tree = tree.right
-                        if tree.right is None and tree.left is None:
-                            file.write(chr(tree.char))
-                            tree = root
+                    if tree.right is None and tree.left is None:
+                        decoded.append(tree.char)
+                        tree = root
+                        if len(decoded) >= buffer_size:
+                            file.write(decoded)
+                            decoded.clear()
+            file.write(decoded)
+
+
+def _decode_bits(
+        tree: HuffmanNode,
+        bits: str,
+        start: int,
+        stop: int) -> tuple[array, bytes, int]:
+    """Decodes the characters that begin in bits[start:stop].
+
+    Returns the position each character began at, the decoded characters,
+    and the position just after the last one.  The character in progress
+    at stop is finished, so the result may run past stop.
+    """
+    # imported here since it imports collections, and only the parallel
+    # decoder needs it
+    from array import array
+
+    # an array takes 8 bytes per start, a list of ints several times that
+    starts = array('q')
+    chars = bytearray()
+    node = tree
+    char_start = start
+    pos = start
+    if start >= stop:
+        return starts, b"", char_start
+
+    for bit in bits[start:]:
+        # a node in a Huffman tree has either two children or none
+        node = node.left if bit == '0' else node.right
+        pos += 1
+        if node.left is None:
+            starts.append(char_start)
+            chars.append(node.char)
+            node = tree
+            char_start = pos
+            if pos >= stop:
+                break
+    return starts, bytes(chars), char_start
+
+
+def _decode_chunk(
+        args: tuple[HuffmanNode, str, int]) -> tuple[array, bytes, int]:
+    # runs in a worker process
+    tree, bits, stop = args
+    return _decode_bits(tree, bits, 0, stop)
+
+
+def _stitch_chunks(
+        tree: HuffmanNode,
+        bits: str,
+        results: list[tuple[array, bytes, int]],
+        chunk_size: int,
+        max_length: int,
+        out_file: BinaryIO) -> int:
+    """Writes the true decoding of bits, given the speculative decoding of
+    each chunk, and returns the position just after the last character."""
+    pos = 0
+    for (starts, chars, end), offset in zip(
+            results, range(0, len(bits), chunk_size)):
+        stop = offset + chunk_size
+        index = bisect_left(starts, pos - offset)
+        # decode one character at a time until we reach a position
+        # the speculative decoding of this chunk agrees with
+        while pos < stop and (
+                index == len(starts) or starts[index] != pos - offset):
+            _, char, length = _decode_bits(
+                tree, bits[pos:pos + max_length], 0, 1)
+            if length == 0:
+                # trailing bits that don't finish a character
+                return pos
+            out_file.write(char)
+            pos += length
+            index = bisect_left(starts, pos - offset, index)
+        if pos < stop:
+            out_file.write(chars[index:])
+            pos = offset + end
+
+    return pos
+
+
+def huffman_decode_parallel(
+        in_filename: str,
+        out_filename: str,
+        workers: Optional[int] = None,
+        max_memory: Optional[int] = None) -> None:
+    """Decodes the input file like huffman_decode, using several processes.
+
+    The bits are split into chunks and every chunk is decoded as if a
+    character started at its first bit.  That guess may be wrong, but
+    Huffman codes resynchronize quickly, so once the true decoding (carried
+    over from the previous chunk) lands on a position where the guessed
+    decoding also started a character, the rest of the chunk's guess is
+    correct and is used as is.  Only the bits before that point are decoded
+    again sequentially.
+
+    The bits are read and decoded one window at a time, sized to keep
+    memory use to about max_memory bytes.  That covers this process and the
+    workers together: each worker counts as WORKER_MEMORY, and at least as
+    much again must be left for the data, so max_memory has to be at least
+    2 * workers * WORKER_MEMORY.  It defaults to that or
+    DEFAULT_MAX_MEMORY, whichever is larger.  If workers is given and does
+    not fit in max_memory, ValueError is raised; if only max_memory is
+    given, the number of CPUs is reduced to what fits, falling back to
+    huffman_decode when that is fewer than two.
+    """
+    if workers is not None and workers <= 0:
+        raise ValueError("workers must be at least 1")
+    if max_memory is None:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        max_memory = max(DEFAULT_MAX_MEMORY, 2 * workers * WORKER_MEMORY)
+    _check_max_memory(max_memory)
+    if workers is None:
+        workers = min(os.cpu_count() or 1,
+                      max_memory // (2 * WORKER_MEMORY))
+    elif 2 * workers * WORKER_MEMORY > max_memory:
+        raise ValueError(
+            f"max_memory of {max_memory} bytes is too small for {workers} "
+            f"workers, which need at least "
+            f"{2 * workers * WORKER_MEMORY}")
+
+    if workers <= 1:
+        huffman_decode(in_filename, out_filename, max_memory)
+        return None
+
+    data_memory = max_memory - workers * WORKER_MEMORY
+    # for every bit of a window this process holds the bits a few times
+    # over (the read, the copy with the leftover, the task slices and
+    # their pickles) and the results, up to 9 bytes per character.  The
+    # workers together hold a quarter of the window at a time, at about
+    # 20 bytes per bit.  32 bytes per bit covers both with room to spare
+    # (codes are at most 255 bits, so a window always holds a character)
+    window_size = max(data_memory // 32, 512)
+
+    # imported here since it is slow to import and most runs never need it
+    from concurrent.futures import ProcessPoolExecutor
+
+    with open(in_filename, 'r') as file_two, \
+            open(out_filename, 'wb') as file, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        tree = None
+        max_length = 0
+        leftover = ""
+        for kind, text in _read_segments(file_two, window_size):
+            if kind == "header":
+                tree = build_huffman_tree(parse_header(text))
+                leftover = ""
+                if tree is not None and (
+                        tree.left is None and tree.right is None):
+                    _write_repeated(
+                        file, tree.char, tree.frequency, window_size)
+                elif tree is not None:
+                    # no code is longer than this, so a chunk never needs
+                    # more bits
+                    max_length = max(len(code) for code in create_codes(tree))
+                continue
+
+            bits = leftover + text
+            chunk_size = max(
+                -(-len(bits) // (workers * CHUNKS_PER_WORKER)), max_length)
+            # positions in a chunk's result are relative to its offset
+            tasks = [(tree, bits[offset:offset + chunk_size + max_length],
+                      chunk_size)
+                     for offset in range(0, len(bits), chunk_size)]
+            results = list(executor.map(_decode_chunk, tasks))
+            pos = _stitch_chunks(
+                tree, bits, results, chunk_size, max_length, file)
+            # the start of a character cut off by the end of the window
+            leftover = bits[pos:]
+
+    return None
+
 
+def _numpy_available() -> bool:
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
-def huffman_encode(in_filename: str, out_filename: str) -> None:
+
+def _import_numpy(max_memory: int):
+    # imported here since it is slow to import and small inputs are
+    # encoded faster without it.  Below twice NUMPY_MEMORY there is too
+    # little left over for the chunks to be worth it
+    if max_memory < 2 * NUMPY_MEMORY:
+        raise ValueError(
+            f"use_numpy=True needs max_memory of at least "
+            f"{2 * NUMPY_MEMORY} bytes")
+    try:
+        import numpy
+    except ImportError as error:
+        raise ImportError(
+            "use_numpy=True needs NumPy, which is not installed") from error
+    return numpy
+
+
+def _use_numpy(size: int, max_memory: int) -> bool:
+    """Returns whether the NumPy engine should encode size bytes.
+
+    NumPy only pays for its import on large inputs, and is never imported
+    when max_memory would not cover its own footprint.
+    """
+    return (size >= NUMPY_MIN_INPUT and
+            max_memory >= 2 * NUMPY_MEMORY and
+            _numpy_available())
+
+
+def write_codes(
+        codes: list[str],
+        in_file: BinaryIO,
+        out_file: TextIO,
+        use_numpy: bool = False,
+        max_memory: int = DEFAULT_MAX_MEMORY) -> None:
+    """Writes the Huffman code of every byte in in_file to out_file.
+
+    The input is encoded in chunks sized so that encoding one uses about
+    max_memory bytes at most.  With use_numpy each chunk is encoded with
+    NumPy array operations, otherwise with str.translate; both produce
+    exactly the same output.  The NumPy engine counts NUMPY_MEMORY of
+    max_memory for NumPy itself, raises ValueError if max_memory is less
+    than twice that, and raises ImportError if NumPy is not installed.
+    """
+    _check_max_memory(max_memory)
+    max_length = max(len(code) for code in codes)
+
+    if use_numpy:
+        np = _import_numpy(max_memory)
+
+        # row i holds the code for byte i as ASCII '0'/'1', padded on the
+        # right up to the longest code, and keep[i] marks the unpadded part
+        table = np.zeros((len(codes), max_length), dtype=np.uint8)
+        for byte in range(len(codes)):
+            table[byte, :len(codes[byte])] = np.frombuffer(
+                codes[byte].encode('ascii'), dtype=np.uint8)
+        lengths = np.array([len(code) for code in codes])
+        keep = np.arange(max_length) < lengths[:, None]
+
+        # a chunk takes a padded row, a row of keep and about four copies
+        # of its codes (selected, as bytes, as text, and written out)
+        chunk_size = (max_memory - NUMPY_MEMORY) // (8 + 8 * max_length)
+        chunk = in_file.read(chunk_size)
+        while chunk:
+            data = np.frombuffer(chunk, dtype=np.uint8)
+            rows = np.take(table, data, axis=0)
+            selected = rows[np.take(keep, data, axis=0)]
+            out_file.write(selected.tobytes().decode('ascii'))
+            chunk = in_file.read(chunk_size)
+        return None
+
+    # a chunk is held as bytes and as latin-1 text, and its codes as text
+    # and again as the bytes written out
+    chunk_size = max(1, max_memory // (4 + 4 * max_length))
+    translation = {ascii: codes[ascii] for ascii in range(len(codes))}
+    chunk = in_file.read(chunk_size)
+    while chunk:
+        out_file.write(chunk.decode('latin-1').translate(translation))
+        chunk = in_file.read(chunk_size)
+
+    return None
+
+
+def huffman_encode(
+        in_filename: str,
+        out_filename: str,
+        max_memory: int = DEFAULT_MAX_MEMORY) -> None:
     """Encodes the data in the input file, writing the result to the
-    output file."""
-    frequencies = count_frequencies(in_filename)
+    output file, using about max_memory bytes at most.
+
+    The input is read as bytes, so any file can be encoded.  NumPy is used
+    to encode large inputs when it is installed.
+    """
+    _check_max_memory(max_memory)
+    use_numpy = _use_numpy(os.path.getsize(in_filename), max_memory)
+    frequencies = count_frequencies(in_filename, max_memory, use_numpy)
     tree = build_huffman_tree(frequencies)
     header = create_header(frequencies)
     # if empty file
@@ -213,9 +605,76 @@ def huffman_encode(in_filename: str, out_filename: str) -> None:
     with open(out_filename, 'w') as file:
         file.write(header)
         file.write("\n")
-        with open(in_filename, 'r') as file_two:
-            for line_of_text in file_two:
-                for char in line_of_text:
-                    file.write(codes[ord(char)])
+        with open(in_filename, 'rb') as file_two:
+            write_codes(codes, file_two, file, use_numpy, max_memory)
+
+    return None
+
+
+def huffman_append(
+        in_filename: str,
+        out_filename: str,
+        max_memory: int = DEFAULT_MAX_MEMORY) -> None:
+    """Encodes the data in the input file and appends it to the already
+    encoded output file as a new segment.
+
+    A segment is a header line followed by its bits, and huffman_decode
+    decodes each segment with its own tree.  The new segment reuses the
+    tree from the output file's first header when that tree can encode
+    every new byte in no more characters, header included, than a tree
+    built for the new data alone; otherwise it gets that new tree.  Only
+    the new data is read and encoded, so the cost does not depend on the
+    size of the output file.  About max_memory bytes are used at most.
+    """
+    _check_max_memory(max_memory)
+    use_numpy = _use_numpy(os.path.getsize(in_filename), max_memory)
+    frequencies = count_frequencies(in_filename, max_memory, use_numpy)
+    if not any(frequencies):
+        return None
+
+    with open(out_filename, 'r') as file:
+        old_header = file.readline().rstrip("\n")
+    old_tree = build_huffman_tree(parse_header(old_header))
+    old_codes = create_codes(old_tree)
+
+    header = create_header(frequencies)
+    tree = build_huffman_tree(frequencies)
+    codes = create_codes(tree)
+
+    def encoded_length(segment_header: str, segment_codes: list[str]) -> int:
+        return len(segment_header) + sum(
+            frequencies[byte] * len(segment_codes[byte])
+            for byte in range(len(frequencies)))
+
+    # a tree with one leaf has the count in its header, so it can't be
+    # shared
+    reusable = (
+            old_tree is not None and
+            (old_tree.left is not None or old_tree.right is not None) and
+            all(old_codes[byte] != "" for byte in range(len(frequencies))
+                if frequencies[byte] != 0)
+    )
+    if reusable and (encoded_length(old_header, old_codes) <=
+                     encoded_length(header, codes)):
+        header = old_header
+        tree = old_tree
+        codes = old_codes
+
+    # the last segment ends with a newline only if it had no bits
+    with open(out_filename, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        separate = file.tell() > 0
+        if separate:
+            file.seek(-1, os.SEEK_END)
+            separate = file.read(1) != b"\n"
+
+    with open(out_filename, 'a') as file:
+        if separate:
+            file.write("\n")
+        file.write(header)
+        file.write("\n")
+        if tree.left is not None or tree.right is not None:
+            with open(in_filename, 'rb') as file_two:
+                write_codes(codes, file_two, file, use_numpy, max_memory)
 
     return None
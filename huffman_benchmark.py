@@ -0,0 +1,70 @@
+"""Measures how long short-lived runs of the codec take.
+
+Each measurement starts a fresh interpreter, so it includes the cost of
+importing huffman.  Run it from the repository root:
+
+    python huffman_benchmark.py
+
+It exits with status 1 if importing huffman or the 1 KB round trip takes
+longer than its budget, so it can be used as a check.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SAMPLE_FILE = "text_files/declaration.txt"
+SAMPLE_SIZE = 1024
+RUNS = 20
+
+# budgets, in milliseconds, on top of the interpreter's own startup
+IMPORT_BUDGET = 15.0
+ROUND_TRIP_BUDGET = 10.0
+
+
+def best_time(code: str) -> float:
+    """Returns the fastest wall time, in seconds, of running code in a new
+    interpreter RUNS times."""
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    with open(SAMPLE_FILE) as file:
+        sample = file.read(SAMPLE_SIZE)
+
+    with tempfile.TemporaryDirectory() as directory:
+        in_filename = os.path.join(directory, "in.txt")
+        out_filename = os.path.join(directory, "out.txt")
+        decoded_filename = os.path.join(directory, "decoded.txt")
+        with open(in_filename, "w") as file:
+            file.write(sample)
+
+        startup = best_time("pass")
+        import_time = best_time("import huffman")
+        round_trip = best_time(
+            "from huffman import huffman_encode, huffman_decode\n"
+            f"huffman_encode({in_filename!r}, {out_filename!r})\n"
+            f"huffman_decode({out_filename!r}, {decoded_filename!r})")
+
+    import_ms = (import_time - startup) * 1000
+    round_trip_ms = (round_trip - import_time) * 1000
+    print(f"interpreter startup:   {startup * 1000:6.1f} ms")
+    print(f"import huffman:        {import_ms:6.1f} ms "
+          f"(budget {IMPORT_BUDGET:.0f} ms)")
+    print(f"1 KB encode + decode:  {round_trip_ms:6.1f} ms "
+          f"(budget {ROUND_TRIP_BUDGET:.0f} ms)")
+
+    if import_ms > IMPORT_BUDGET or round_trip_ms > ROUND_TRIP_BUDGET:
+        print("over budget")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,19 @@
+import io
+import os
+import subprocess
+import tracemalloc
 import unittest
+from unittest import mock
 
-from huffman import HuffmanNode, tree_traversal
+from huffman import (
+    HuffmanNode, tree_traversal, huffman_encode, huffman_decode,
+    huffman_append, count_frequencies, build_huffman_tree, create_codes,
+    write_codes, huffman_decode_parallel)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class TestList(unittest.TestCase):
@@ -37,6 +50,232 @@ class TestList(unittest.TestCase):
         with self.assertRaises(StopIteration):
             next(code_iter)
 
+    def test_append_same_tree(self):
+        huffman_encode("text_files/file1.txt", "text_files/append_out.txt")
+        with open("text_files/append_out.txt") as encoded:
+            header = encoded.readline()
+
+        huffman_append("text_files/file1.txt", "text_files/append_out.txt")
+        huffman_decode(
+            "text_files/append_out.txt", "text_files/append_decoded.txt")
+
+        with open("text_files/append_out.txt") as encoded:
+            self.assertEqual(encoded.readline(), header)
+        with open("text_files/append_decoded.txt") as student_out, \
+                open("text_files/file1.txt") as correct_out:
+            self.assertEqual(student_out.read(), correct_out.read() * 2)
+
+    def test_append_new_chars(self):
+        huffman_encode("text_files/single.txt", "text_files/append_out.txt")
+        huffman_append("text_files/file2.txt", "text_files/append_out.txt")
+        huffman_decode(
+            "text_files/append_out.txt", "text_files/append_decoded.txt")
+
+        with open("text_files/append_decoded.txt") as student_out, \
+                open("text_files/single.txt") as first, \
+                open("text_files/file2.txt") as second:
+            self.assertEqual(student_out.read(), first.read() + second.read())
+
+    def test_append_unseen_byte_keeps_archive(self):
+        huffman_encode("text_files/file1.txt", "text_files/append_out.txt")
+        with open("text_files/append_out.txt") as encoded:
+            before = encoded.read()
+
+        # file2 has bytes file1's tree has no code for, then single has
+        # a single byte value, so it is a segment without bits
+        huffman_append("text_files/file2.txt", "text_files/append_out.txt")
+        huffman_append("text_files/single.txt", "text_files/append_out.txt")
+        huffman_append("text_files/file1.txt", "text_files/append_out.txt")
+
+        with open("text_files/append_out.txt") as encoded:
+            self.assertTrue(encoded.read().startswith(before))
+        with open("text_files/file1.txt") as file1, \
+                open("text_files/file2.txt") as file2, \
+                open("text_files/single.txt") as single:
+            first = file1.read()
+            expected = first + file2.read() + single.read() + first
+
+        huffman_decode(
+            "text_files/append_out.txt", "text_files/append_decoded.txt")
+        with open("text_files/append_decoded.txt") as student_out:
+            self.assertEqual(student_out.read(), expected)
+
+        huffman_decode_parallel(
+            "text_files/append_out.txt", "text_files/append_decoded.txt", 2)
+        with open("text_files/append_decoded.txt") as student_out:
+            self.assertEqual(student_out.read(), expected)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_write_codes_numpy_matches_scalar(self):
+        filename = "text_files/declaration.txt"
+        codes = create_codes(build_huffman_tree(count_frequencies(filename)))
+
+        outputs = []
+        for use_numpy in (False, True):
+            out_file = io.StringIO()
+            with open(filename, 'rb') as in_file:
+                write_codes(codes, in_file, out_file, use_numpy)
+            outputs.append(out_file.getvalue())
+
+        self.assertEqual(outputs[0], outputs[1])
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_count_frequencies_numpy_matches_scalar(self):
+        filename = "text_files/declaration.txt"
+
+        self.assertEqual(
+            count_frequencies(filename, use_numpy=True),
+            count_frequencies(filename, use_numpy=False))
+
+    def test_numpy_small_max_memory(self):
+        filename = "text_files/declaration.txt"
+        codes = create_codes(build_huffman_tree(count_frequencies(filename)))
+
+        with self.assertRaises(ValueError):
+            count_frequencies(filename, 1 << 20, True)
+        with open(filename, 'rb') as in_file:
+            with self.assertRaises(ValueError):
+                write_codes(codes, in_file, io.StringIO(), True, 1 << 22)
+
+    def test_write_codes_numpy_missing(self):
+        codes = create_codes(HuffmanNode(
+            97, 15, HuffmanNode(97, 5), HuffmanNode(98, 10)))
+
+        with mock.patch.dict("sys.modules", {"numpy": None}):
+            with self.assertRaises(ImportError):
+                write_codes(codes, io.BytesIO(b"ab"), io.StringIO(), True)
+
+    def test_decode_parallel_dec(self):
+        huffman_decode_parallel(
+            "text_files/declaration_soln.txt",
+            "text_files/dec_parallel_decoded.txt",
+            4)
+
+        with open("text_files/dec_parallel_decoded.txt") as student_out, \
+                open("text_files/declaration.txt") as correct_out:
+            self.assertEqual(student_out.read(), correct_out.read())
+
+    def test_decode_parallel_no_workers(self):
+        with self.assertRaises(ValueError):
+            huffman_decode_parallel(
+                "text_files/declaration_soln.txt",
+                "text_files/dec_parallel_decoded.txt",
+                0)
+
+    def test_max_memory_not_positive(self):
+        with self.assertRaises(ValueError):
+            huffman_encode(
+                "text_files/file1.txt", "text_files/file1_out.txt", -5)
+        with self.assertRaises(ValueError):
+            huffman_decode(
+                "text_files/file1_soln.txt", "text_files/file1_decoded.txt",
+                0)
+        with self.assertRaises(ValueError):
+            huffman_decode_parallel(
+                "text_files/declaration_soln.txt",
+                "text_files/dec_parallel_decoded.txt",
+                2,
+                0)
+
+    def test_decode_parallel_too_many_workers(self):
+        with self.assertRaises(ValueError):
+            huffman_decode_parallel(
+                "text_files/declaration_soln.txt",
+                "text_files/dec_parallel_decoded.txt",
+                4,
+                1 << 20)
+
+    def test_decode_parallel_single_char(self):
+        huffman_decode_parallel(
+            "text_files/single_char_soln.txt",
+            "text_files/single_parallel_decoded.txt",
+            4)
+
+        with open("text_files/single_parallel_decoded.txt") as student_out, \
+                open("text_files/single.txt") as correct_out:
+            self.assertEqual(student_out.read(), correct_out.read())
+
+    def test_encode_small_max_memory(self):
+        huffman_encode(
+            "text_files/declaration.txt", "text_files/dec_small_out.txt", 64)
+
+        result = subprocess.run(
+            ["diff",
+             "--strip-trailing-cr",
+             "text_files/dec_small_out.txt",
+             "text_files/declaration_soln.txt"],
+            check=False,
+            text=True,
+            capture_output=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stdout)
+
+    def test_decode_small_max_memory(self):
+        huffman_decode(
+            "text_files/declaration_soln.txt",
+            "text_files/dec_small_decoded.txt",
+            64)
+
+        with open("text_files/dec_small_decoded.txt") as student_out, \
+                open("text_files/declaration.txt") as correct_out:
+            self.assertEqual(student_out.read(), correct_out.read())
+
+    def test_decode_parallel_small_max_memory(self):
+        # shrink the per-worker allowance so that a small max_memory still
+        # leaves room for workers, and the bits are decoded in many windows
+        with mock.patch("huffman.WORKER_MEMORY", 1024):
+            huffman_decode_parallel(
+                "text_files/declaration_soln.txt",
+                "text_files/dec_parallel_decoded.txt",
+                4,
+                16384)
+
+        with open("text_files/dec_parallel_decoded.txt") as student_out, \
+                open("text_files/declaration.txt") as correct_out:
+            self.assertEqual(student_out.read(), correct_out.read())
+
+    def test_binary_round_trip(self):
+        data = os.urandom(4096) + b"\r\n\r\n"
+        with open("text_files/binary_out.bin", "wb") as file:
+            file.write(data)
+
+        huffman_encode(
+            "text_files/binary_out.bin", "text_files/binary_out.txt")
+        huffman_decode(
+            "text_files/binary_out.txt", "text_files/binary_decoded.bin")
+        with open("text_files/binary_decoded.bin", "rb") as decoded:
+            self.assertEqual(decoded.read(), data)
+
+        huffman_decode_parallel(
+            "text_files/binary_out.txt", "text_files/binary_decoded.bin", 2)
+        with open("text_files/binary_decoded.bin", "rb") as decoded:
+            self.assertEqual(decoded.read(), data)
+
+    def test_max_memory_peak(self):
+        max_memory = 1 << 17
+        with open("text_files/declaration.txt", "rb") as file:
+            data = file.read()
+        with open("text_files/big_out.txt", "wb") as file:
+            for _ in range(32):
+                file.write(data)
+
+        tracemalloc.start()
+        try:
+            huffman_encode(
+                "text_files/big_out.txt", "text_files/big_encoded.txt",
+                max_memory)
+            _, encode_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            huffman_decode(
+                "text_files/big_encoded.txt", "text_files/big_decoded.txt",
+                max_memory)
+            _, decode_peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(encode_peak, max_memory)
+        self.assertLess(decode_peak, max_memory)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Optional
+# typing is only needed for the annotations, which aren't evaluated.
+# TYPE_CHECKING is spelled out on purpose: typing.TYPE_CHECKING would
+# import typing, which is most of this module's import time.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Optional
 
 
 class Node: